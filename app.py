@@ -1,60 +1,121 @@
 import sys
+import threading
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from functools import partial
+from itertools import count
 from pathlib import Path
-from time import sleep
-from typing import Optional
+from time import monotonic
+from typing import Callable, Iterable, Iterator, Optional
 
 from loguru import logger
 
 from sync_services import SyncService
-from utils import get_local_files
-from exceptions import RequestError, APIUrlsError, NotFoundHostPathError
+from utils import (
+    get_files_signature,
+    get_local_files,
+    get_retry_delay,
+    load_hash_cache,
+    save_hash_cache,
+    update_files_signature,
+    update_local_files,
+)
+from exceptions import RequestError, NotFoundHostPathError, NotFoundLocalPathError
+
+try:
+    from inotify_simple import INotify, flags
+except ImportError:
+    INotify = None
 
 
 class SyncApp:
     """
     Приложение для синхронизации локальных файлов с удаленным хранилищем.
 
-    Сравнивает файлы по MD5-хэшу.
+    Сравнивает файлы по MD5-хэшу. Загрузка, обновление и удаление файлов выполняются параллельно.
+    Если доступен inotify (Linux), изменения локальных файлов отслеживаются ядром,
+    и повторно хешируются только измененные файлы. Изменения, о которых inotify не сообщает
+    (запись без закрытия файла, жесткие ссылки, изменение файлов по символическим ссылкам),
+    обнаруживаются полным сканированием директории не реже чем раз в timeout секунд.
 
     Атрибуты:
-        _files_local (dict[str, str]): Словарь для хранения локальных файлов (название файла и MD5-хэш файла).
+        _files_local (dict[str, Optional[str]]): Словарь для хранения локальных файлов (название файла и MD5-хэш файла,
+            None — файл не удалось прочитать).
+        _local_sig (int): Сигнатура словаря _files_local (см. utils.get_files_signature).
         _path_local (Path): Путь к локальному хранилищу.
         _client (SyncService): Клиент для взаимодействия с удаленным хранилищем.
+        _hash_workers (int): Количество потоков для хеширования локальных файлов.
+        _max_workers (int): Максимальное количество одновременно выполняемых операций с удаленным хранилищем.
+        _pool (ThreadPoolExecutor): Пул потоков для операций с удаленным хранилищем.
+        _read_delay (int): Время накопления событий inotify после первого события (в миллисекундах).
+        _min_sync_interval (float): Минимальный интервал между циклами синхронизации при наличии inotify (в секундах).
+        _stop (threading.Event): Признак остановки приложения. Повторные попытки и ожидания прерываются,
+            как только он установлен (см. close).
     """
 
-    _files_local: dict[str, str] = {}
+    _files_local: dict[str, Optional[str]] = {}
+    _local_sig: int = 0
+    _read_delay: int = 100
+    _min_sync_interval: float = 1.0
 
-    def __init__(self, path_local: Path, client: SyncService):
+    def __init__(self, path_local: Path, client: SyncService, max_workers: int = 16, hash_workers: int = 8):
         """
         Инициализация SyncApp.
 
         Аргументы:
             path_local (Path): Путь к локальному хранилищу.
             client (SyncService): Клиент для взаимодействия с удаленным хранилищем.
+            max_workers (int): Максимальное количество одновременно выполняемых операций с удаленным хранилищем.
+            hash_workers (int): Количество потоков для хеширования локальных файлов.
         """
 
         self._path_local = path_local
         self._client = client
+        self._hash_workers = hash_workers
+        self._max_workers = max_workers
+        self._pool = ThreadPoolExecutor(max_workers=max_workers)
+        self._stop = threading.Event()
 
-    def _get_host_files(self, debug_timeout: int) -> dict[str, str]:
+    def __enter__(self) -> "SyncApp":
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback) -> None:
+        self.close()
+
+    def close(self) -> None:
+        """
+        Останавливает приложение.
+
+        Устанавливает признак остановки, отменяет операции, еще не начавшиеся в пуле потоков,
+        и дожидается завершения текущих. Операции, ожидающие повторной попытки в SyncApp, завершаются сразу.
+        Уже начатый HTTP-запрос не прерывается: он завершается с учетом таймаутов и ограниченных
+        повторов на уровне HTTP-сессии клиента, а начатая загрузка файла — после отправки файла.
+        Если run ожидает события inotify в другом потоке, он завершится не позже чем через timeout секунд.
+        Хеши, вычисленные после последнего полного сканирования, сохраняются в кэш.
+        """
+
+        self._stop.set()
+        self._pool.shutdown(cancel_futures=True)
+        save_hash_cache()
+
+    def _get_host_files(self, debug_timeout: int) -> Optional[dict[str, str]]:
         """
         Получает словарь локальных файлов и их MD5-хешей.
 
-        Если возникает ошибка, функция повторяет попытку получения списка файлов.
+        Если возникает ошибка, функция повторяет попытку получения списка файлов с экспоненциально растущим интервалом.
         Если возникает ошибка FileNotFoundError, функция завершает работу приложения с кодом 1.
 
         Аргументы:
             path_local (Path): Путь к локальной директории, где находятся файлы.
 
         Возвращает:
-            dict[str, str]: Словарь, где ключом является имя файла,
-            а значением — его MD5-хеш.
+            Optional[dict[str, str]]: Словарь, где ключом является имя файла,
+            а значением — его MD5-хеш, или None, если приложение остановлено во время ожидания.
 
         Исключения:
             FileNotFoundError: Если указанная директория не найдена.
         """
 
-        while True:
+        for attempt in count():
             try:
                 result = self._client.get_info()
             except NotFoundHostPathError as exc:
@@ -64,13 +125,14 @@ class SyncApp:
                     )
                 )
                 sys.exit(1)
-            except (RequestError, APIUrlsError, Exception) as exc:
+            except (RequestError, Exception) as exc:
                 logger.error(
                     "ОШИБКА. Не удалось получить список файлов с удаленного хранилища. {}".format(
                         exc
                     )
                 )
-                sleep(debug_timeout)
+                if self._stop.wait(get_retry_delay(attempt=attempt, debug_timeout=debug_timeout)):
+                    return None
             else:
                 return result
 
@@ -78,19 +140,21 @@ class SyncApp:
         """
         Удаляет файл из удаленного хранилища.
 
-        Если возникает ошибка при удалении файла, будет осуществлена повторная попытка через указанный интервал.
+        Если возникает ошибка при удалении файла, будет осуществлена повторная попытка
+        с экспоненциально растущим интервалом.
 
         Аргументы:
             filename (str): Имя файла для удаления.
-            debug_timeout (int): Время ожидания перед повторной попыткой в случае ошибки.
+            debug_timeout (int): Начальное время ожидания перед повторной попыткой в случае ошибки.
         """
 
-        while True:
+        for attempt in count():
             try:
                 self._client.delete(filename)
-            except (RequestError, APIUrlsError, Exception) as exc:
+            except (RequestError, Exception) as exc:
                 logger.error("ОШИБКА. Файл {!r} не удален. {}".format(filename, exc))
-                sleep(debug_timeout)
+                if self._stop.wait(get_retry_delay(attempt=attempt, debug_timeout=debug_timeout)):
+                    return
             else:
                 logger.info("Файл {!r} успешно удален.".format(filename))
                 return
@@ -99,21 +163,24 @@ class SyncApp:
         """
         Обновляет файл в удаленном хранилище.
 
-        Если возникает ошибка при обновлении файла, будет осуществлена повторная попытка через указанный интервал.
+        Если возникает ошибка при обновлении файла, будет осуществлена повторная попытка
+        с экспоненциально растущим интервалом. Если локальный файл не найден, операция прекращается.
 
         Аргументы:
             filename (str): Имя файла для обновления.
-            debug_timeout (int): Время ожидания перед повторной попыткой в случае ошибки.
+            debug_timeout (int): Начальное время ожидания перед повторной попыткой в случае ошибки.
         """
 
-        while True:
+        for attempt in count():
             try:
                 self._client.reload(path_local_file=self._path_local / filename)
             except FileNotFoundError:
                 logger.error("ОШИБКА. Файл {!r} не найден.".format(filename))
-            except (RequestError, APIUrlsError, Exception) as exc:
+                return
+            except (RequestError, Exception) as exc:
                 logger.error("ОШИБКА. Файл {!r} не обновлен. {}".format(filename, exc))
-                sleep(debug_timeout)
+                if self._stop.wait(get_retry_delay(attempt=attempt, debug_timeout=debug_timeout)):
+                    return
             else:
                 logger.info("Файл {!r} успешно обновлен.".format(filename))
                 return
@@ -122,25 +189,55 @@ class SyncApp:
         """
         Загружает файл в удаленное хранилище.
 
-        Если возникает ошибка при загрузке файла, будет осуществлена повторная попытка через указанный интервал.
+        Если возникает ошибка при загрузке файла, будет осуществлена повторная попытка
+        с экспоненциально растущим интервалом. Если локальный файл не найден, операция прекращается.
 
         Аргументы:
             filename (str): Имя файла для загрузки.
-            debug_timeout (int): Время ожидания перед повторной попыткой в случае ошибки.
+            debug_timeout (int): Начальное время ожидания перед повторной попыткой в случае ошибки.
         """
 
-        while True:
+        for attempt in count():
             try:
                 self._client.load(path_local_file=self._path_local / filename)
             except FileNotFoundError:
                 logger.error("ОШИБКА. Файл {!r} не найден.".format(filename))
-            except (RequestError, APIUrlsError, Exception) as exc:
+                return
+            except (RequestError, Exception) as exc:
                 logger.error("ОШИБКА. Файл {!r} не загружен. {}".format(filename, exc))
-                sleep(debug_timeout)
+                if self._stop.wait(get_retry_delay(attempt=attempt, debug_timeout=debug_timeout)):
+                    return
             else:
                 logger.info("Файл {!r} успешно загружен.".format(filename))
                 return
 
+    def _run_concurrently(self, tasks: Iterable[Callable[..., None]], debug_timeout: int) -> None:
+        """
+        Параллельно выполняет операции над файлами.
+
+        Операции с удаленным хранилищем ограничены сетевыми задержками, поэтому выполняются в пуле потоков.
+        В пул одновременно передается не больше _max_workers операций: следующая операция передается
+        после завершения одной из текущих, поэтому число объектов Future не зависит от количества файлов.
+        Операции берутся из tasks по мере освобождения мест, поэтому tasks может быть генератором.
+        Метод дожидается завершения всех операций.
+
+        Аргументы:
+            tasks (Iterable[Callable[..., None]]): Операции над файлами (_delete, _reload или _load
+                с уже привязанными аргументами, кроме debug_timeout).
+            debug_timeout (int): Время ожидания перед повторной попыткой в случае ошибки.
+        """
+
+        pending: set[Future] = set()
+        for task in tasks:
+            if len(pending) >= self._max_workers:
+                done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    future.result()
+            pending.add(self._pool.submit(task, debug_timeout=debug_timeout))
+
+        for future in wait(pending).done:
+            future.result()
+
     @classmethod
     def _set_logger(cls, debug: Optional[bool] = False) -> None:
         """
@@ -154,58 +251,122 @@ class SyncApp:
         logger.remove()
         logger.add(sys.stdout, level="DEBUG" if debug else "INFO", format=format_logger)
 
-    def _check_host_files(self, files_host: dict[str, str], debug_timeout: int) -> None:
+    def _watch_local(self) -> Optional["INotify"]:
         """
-        Проверяет наличие файлов на удаленном хранилище и удаляет отсутствующие,
-        на локальной машине, файлы из удаленного хранилища.
+        Создает наблюдение inotify за локальной директорией.
+
+        Возвращает:
+            Optional[INotify]: Объект INotify или None, если inotify недоступен
+            (в этом случае используется периодическое сканирование директории).
+        """
+
+        if INotify is None:
+            logger.debug("inotify недоступен, используется периодическое сканирование.")
+            return None
+
+        try:
+            inotify = INotify()
+            inotify.add_watch(
+                self._path_local,
+                flags.CLOSE_WRITE | flags.DELETE | flags.MOVED_TO | flags.MOVED_FROM,
+            )
+        except OSError as exc:
+            logger.debug("Не удалось создать наблюдение inotify, используется периодическое сканирование. {}", exc)
+            return None
+
+        return inotify
+
+    @classmethod
+    def _wait_local_changes(cls, inotify: "INotify", timeout: int) -> Optional[set[str]]:
+        """
+        Ожидает изменений в локальной директории не дольше timeout секунд.
+
+        Аргументы:
+            inotify (INotify): Объект INotify, наблюдающий за локальной директорией.
+            timeout (int): Максимальное время ожидания (в секундах).
+
+        Возвращает:
+            Optional[set[str]]: Имена измененных файлов или None, если требуется
+            полное сканирование директории (переполнение очереди событий или удаление наблюдения).
+        """
+
+        changed = set()
+        for event in inotify.read(timeout=timeout * 1000, read_delay=cls._read_delay):
+            if event.mask & (flags.Q_OVERFLOW | flags.IGNORED):
+                return None
+            changed.add(event.name)
+        return changed
+
+    def _compute_diff(self, files_host: dict[str, str]) -> tuple[set[str], set[str], set[str]]:
+        """
+        Сравнивает локальные файлы с файлами на удаленном хранилище за один проход.
+
+        Файлы, которые не удалось прочитать (хеш None), не загружаются, не обновляются и не удаляются.
 
         Аргументы:
             files_host (dict[str, str]): Словарь файлов на удаленном хранилище.
-            debug_timeout (int): Время ожидания перед повторной попыткой в случае ошибки.
+
+        Возвращает:
+            tuple[set[str], set[str], set[str]]: Имена файлов для удаления, обновления и загрузки.
         """
 
-        logger.debug("Начало итерации по списку файлов с удаленного хранилища.")
-        logger.debug("files_host={}, self._files_local={}".format(files_host, self._files_local))
-        for filename, f_datetime in files_host.items():
-            if filename not in self._files_local:
-                logger.debug(
-                    "Файл {!r} отсутствует на локальном хранилище.".format(
-                        filename
-                    )
-                )
-                logger.info("Удаление файла {!r}.".format(filename))
-                self._delete(filename=filename, debug_timeout=debug_timeout)
-        logger.debug("Конец итерации по списку файлов с удаленного хранилища.")
+        local_keys = {filename for filename, md5_hash in self._files_local.items() if md5_hash is not None}
+        host_keys = files_host.keys()
 
-    def _check_local_files(self, files_host: dict[str, str], debug_timeout: int) -> None:
+        to_delete = host_keys - self._files_local.keys()
+        to_reload = {
+            filename
+            for filename in local_keys & host_keys
+            if self._files_local[filename] != files_host[filename]
+        }
+        to_load = local_keys - host_keys
+
+        return to_delete, to_reload, to_load
+
+    def _check_files(self, files_host: dict[str, str], debug_timeout: int) -> None:
         """
-        Проверяет наличие локальных файлов и загружает отсутствующие файлы на удаленное хранилище,
-        а также обновляет файлы с изменившимися MD5-хэшами.
+        Удаляет из удаленного хранилища файлы, отсутствующие на локальной машине,
+        обновляет файлы с изменившимися MD5-хэшами и загружает отсутствующие на удаленном хранилище файлы.
+
+        Все операции выполняются параллельно.
 
         Аргументы:
             files_host (dict[str, str]): Словарь файлов на удаленном хранилище.
             debug_timeout (int): Время ожидания перед повторной попыткой в случае ошибки.
         """
 
-        logger.debug("Начало итерации по списку файлов с локального хранилища.")
-        logger.debug("files_host={}, self._files_local={}".format(files_host, self._files_local))
-        for filename, f_md5hash in self._files_local.items():
-            if filename in files_host:
-                if f_md5hash != files_host[filename]:
-                    logger.debug(
-                        "Хэш md5 файлов {!r} не совпадают.".format(filename)
-                    )
-                    logger.info("Обновление файла {!r}".format(filename))
-                    self._reload(filename=filename, debug_timeout=debug_timeout)
-            else:
-                logger.debug(
-                    "Файл {!r} отсутствует на удаленном хранилище.".format(
-                        filename
-                    )
-                )
-                logger.info("Загрузка файла {!r}.".format(filename))
-                self._load(filename=filename, debug_timeout=debug_timeout)
-        logger.debug("Конец итерации по списку файлов с локального хранилища.")
+        logger.debug("files_host={}, self._files_local={}", files_host, self._files_local)
+        to_delete, to_reload, to_load = self._compute_diff(files_host=files_host)
+
+        tasks = self._iter_tasks(to_delete=to_delete, to_reload=to_reload, to_load=to_load)
+        self._run_concurrently(tasks, debug_timeout=debug_timeout)
+
+    def _iter_tasks(self, to_delete: set[str], to_reload: set[str], to_load: set[str]) -> Iterator[Callable[..., None]]:
+        """
+        Последовательно возвращает операции над файлами для _run_concurrently.
+
+        Удаления возвращаются первыми, затем обновления и загрузки. URL для загрузки каждый файл
+        получает в своей операции непосредственно перед загрузкой (см. SyncService.load).
+
+        Аргументы:
+            to_delete (set[str]): Имена файлов для удаления.
+            to_reload (set[str]): Имена файлов для обновления.
+            to_load (set[str]): Имена файлов для загрузки.
+
+        Возвращает:
+            Iterator[Callable[..., None]]: Операции с уже привязанными аргументами, кроме debug_timeout.
+        """
+
+        for filename in to_delete:
+            logger.info("Удаление файла {!r}.".format(filename))
+            yield partial(self._delete, filename=filename)
+
+        for filename in to_reload:
+            logger.info("Обновление файла {!r}".format(filename))
+            yield partial(self._reload, filename=filename)
+        for filename in to_load:
+            logger.info("Загрузка файла {!r}.".format(filename))
+            yield partial(self._load, filename=filename)
 
     def run(self, timeout: int, debug_timeout: int, debug: Optional[bool]):
         """
@@ -219,28 +380,89 @@ class SyncApp:
             debug_timeout (int): Время ожидания при ошибках.
             debug (Optional[bool]): Уровень логирования (True для DEBUG).
 
-         Примечание: Метод работает бесконечно до его принудительного завершения.
+         Примечание: Метод работает до вызова close (при ожидании событий inotify — еще не дольше timeout секунд)
+         или принудительного завершения.
          При каждом цикле происходит проверка наличия изменений как в локальном,
-         так и в удаленном хранилище.
+         так и в удаленном хранилище. При наличии inotify ожидание прерывается
+         сразу после изменения локальных файлов.
          """
 
         self._set_logger(debug=debug)
 
+        load_hash_cache()
+        inotify = self._watch_local()
+        changed: Optional[set[str]] = None
+        last_full_scan = 0.0
+        scan_attempt = 0
+
         logger.info("Начало синхронизации.")
-        while True:
-            logger.debug("Обновление списка локальных файлов.")
-            self._files_local = get_local_files(path_local=self._path_local, debug_timeout=debug_timeout)
-            logger.debug("Список локальных файлов: {}".format(self._files_local))
+        while not self._stop.is_set():
+            cycle_start = monotonic()
+            # Полное сканирование дешево благодаря кэшу хешей и выполняется не реже чем раз в timeout секунд,
+            # чтобы учесть изменения, о которых inotify не сообщает.
+            if changed is not None and cycle_start - last_full_scan >= timeout:
+                changed = None
+            if changed is None:
+                last_full_scan = cycle_start
+
+            # Сканирование локальной директории выполняется в пуле потоков параллельно
+            # с получением списка файлов с удаленного хранилища.
+            local_future: Optional[Future] = None
+            if changed is None:
+                logger.debug("Обновление списка локальных файлов.")
+                local_future = self._pool.submit(
+                    get_local_files,
+                    path_local=self._path_local,
+                    debug_timeout=debug_timeout,
+                    max_workers=self._hash_workers,
+                )
+            elif changed:
+                logger.debug("Обновление измененных локальных файлов: {}", changed)
+                local_future = self._pool.submit(
+                    update_local_files, path_local=self._path_local, files_local=self._files_local, filenames=changed
+                )
 
             logger.debug("Обновление списка файлов на удаленном хранилище.")
             files_host = self._get_host_files(debug_timeout=debug_timeout)
-            logger.debug("Список файлов на удаленном хранилище: {}".format(files_host))
+            if files_host is None:
+                return
+            logger.debug("Список файлов на удаленном хранилище: {}", files_host)
+
+            if local_future is not None:
+                try:
+                    files_local = local_future.result()
+                except NotFoundLocalPathError as exc:
+                    logger.error("ОШИБКА. {}".format(exc))
+                    sys.exit(1)
+                except OSError as exc:
+                    logger.error("ОШИБКА. Не удалось получить список локальных файлов. {}".format(exc))
+                    self._stop.wait(get_retry_delay(attempt=scan_attempt, debug_timeout=debug_timeout))
+                    scan_attempt += 1
+                    changed = None
+                    continue
+                scan_attempt = 0
+                if changed is None:
+                    self._local_sig = get_files_signature(files_local)
+                else:
+                    self._local_sig = update_files_signature(
+                        signature=self._local_sig, files_old=self._files_local, files_new=files_local, filenames=changed
+                    )
+                self._files_local = files_local
+            logger.debug("Список локальных файлов: {}", self._files_local)
 
-            if self._files_local != files_host:
+            # Сигнатура локальных файлов обновляется только по измененным файлам,
+            # поэтому полный проход выполняется лишь по списку с удаленного хранилища.
+            # При разном количестве файлов списки заведомо различаются, и сигнатура не вычисляется.
+            if len(self._files_local) != len(files_host) or self._local_sig != get_files_signature(files_host):
                 logger.debug("Списки не совпадают.")
-                self._check_host_files(files_host=files_host, debug_timeout=debug_timeout)
-                self._check_local_files(files_host=files_host, debug_timeout=debug_timeout)
+                self._check_files(files_host=files_host, debug_timeout=debug_timeout)
             else:
                 logger.debug("Списки совпадают.")
-            logger.debug("Программа ушла в ожидание на {} секунд.".format(timeout))
-            sleep(timeout)
+            logger.debug("Программа ушла в ожидание на {} секунд.", timeout)
+            if inotify is None:
+                self._stop.wait(timeout)
+            else:
+                # Циклы (и запросы списка файлов с удаленного хранилища) выполняются не чаще
+                # одного раза в _min_sync_interval: события, пришедшие за это время, обрабатываются вместе.
+                self._stop.wait(max(0.0, cycle_start + self._min_sync_interval - monotonic()))
+                changed = self._wait_local_changes(inotify=inotify, timeout=timeout)
@@ -8,5 +8,8 @@ DEBUG = True if os.environ.get("DEBUG") == "True" else False
 TOKEN = os.environ.get("TOKEN")
 TIMEOUT = int(os.environ.get("TIMEOUT", 15))
 DEBUG_TIMEOUT = int(os.environ.get("DEBUG_TIMEOUT", 3))
+SYNC_CONCURRENCY = int(os.environ.get("SYNC_CONCURRENCY", 16))
+UPLOAD_CONCURRENCY = int(os.environ.get("UPLOAD_CONCURRENCY", 6))
+HASH_WORKERS = int(os.environ.get("HASH_WORKERS", 8))
 PATH_LOCAL = os.environ.get("PATH_LOCAL")
 PATH_HOST_YANDEX = os.environ.get("PATH_HOST_YANDEX")
@@ -33,13 +33,13 @@ class NotFoundHostPathError(Exception):
         super().__init__(message)
 
 
-class APIUrlsError(Exception):
+class NotFoundLocalPathError(Exception):
     """
-    Исключение, возникающее при отсутствии необходимых URL для работы с API.
+    Исключение, возникающее при неверно указанном пути на локальном устройстве.
 
     Атрибуты:
-        message (str): Сообщение об ошибке, по умолчанию "Внутренняя ошибка приложения. Не найдено URL для работы с API в urls."
+        message (str): Сообщение об ошибке, по умолчанию "Неверно указан путь на локальном устройстве."
     """
 
-    def __init__(self, message: str = "Внутренняя ошибка приложения. Не найдено URL для работы с API в urls."):
+    def __init__(self, message: str = "Неверно указан путь на локальном устройстве."):
         super().__init__(message)
@@ -3,7 +3,17 @@ from pathlib import Path
 from loguru import logger
 
 from app import SyncApp
-from config import DEBUG, DEBUG_TIMEOUT, PATH_HOST_YANDEX, PATH_LOCAL, TIMEOUT, TOKEN
+from config import (
+    DEBUG,
+    DEBUG_TIMEOUT,
+    HASH_WORKERS,
+    PATH_HOST_YANDEX,
+    PATH_LOCAL,
+    SYNC_CONCURRENCY,
+    TIMEOUT,
+    TOKEN,
+    UPLOAD_CONCURRENCY,
+)
 from sync_services import YandexDiskSyncService
 from exceptions import EnvError
 
@@ -19,8 +29,15 @@ elif not PATH_HOST_YANDEX:
 
 path_local = Path(PATH_LOCAL)
 
-client_yandex = YandexDiskSyncService(token=TOKEN, path_host=Path(PATH_HOST_YANDEX))
-app_yandex = SyncApp(path_local=path_local, client=client_yandex)
+client_yandex = YandexDiskSyncService(
+    token=TOKEN,
+    path_host=Path(PATH_HOST_YANDEX),
+    max_workers=SYNC_CONCURRENCY,
+    max_uploads=UPLOAD_CONCURRENCY,
+)
+app_yandex = SyncApp(path_local=path_local, client=client_yandex, max_workers=SYNC_CONCURRENCY, hash_workers=HASH_WORKERS)
 
 if __name__ == "__main__":
-    app_yandex.run(timeout=TIMEOUT, debug=DEBUG, debug_timeout=DEBUG_TIMEOUT)
+    # Приложение закрывается раньше клиента: его потоки должны завершиться до закрытия HTTP-сессии.
+    with client_yandex, app_yandex:
+        app_yandex.run(timeout=TIMEOUT, debug=DEBUG, debug_timeout=DEBUG_TIMEOUT)
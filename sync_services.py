@@ -1,16 +1,77 @@
+import os
+import threading
 from abc import ABC, abstractmethod
+from itertools import count
 from pathlib import Path
+from typing import BinaryIO, Iterator, Optional
 
+import orjson
 import requests
 from loguru import logger
+from requests.adapters import HTTPAdapter
+from urllib3.util import Retry
 
-from exceptions import RequestError, APIUrlsError, NotFoundHostPathError
+from exceptions import RequestError, NotFoundHostPathError
+
+
+class _BoundedRetry(Retry):
+    """
+    Повторные попытки urllib3, в которых ожидание по заголовку Retry-After не превышает MAX_RETRY_AFTER секунд.
+    """
+
+    MAX_RETRY_AFTER = 5
+
+    def get_retry_after(self, response) -> Optional[float]:
+        retry_after = super().get_retry_after(response)
+        return None if retry_after is None else min(retry_after, self.MAX_RETRY_AFTER)
+
+
+class FileChunks:
+    """
+    Итерируемая обертка над файлом для потоковой передачи тела HTTP-запроса блоками по 8 МиБ.
+
+    Блоки читаются в один переиспользуемый буфер. Наличие __len__ позволяет requests выставить Content-Length.
+
+    Атрибуты:
+        _file (BinaryIO): Файл, открытый на чтение в бинарном режиме.
+        _size (int): Размер файла в байтах.
+        _chunk_size (int): Размер блока чтения в байтах.
+    """
+
+    def __init__(self, file: BinaryIO, chunk_size: int = 8 << 20):
+        """
+        Инициализация FileChunks.
+
+        Аргументы:
+            file (BinaryIO): Файл, открытый на чтение в бинарном режиме.
+            chunk_size (int): Размер блока чтения в байтах (по умолчанию 8 МиБ).
+        """
+
+        self._file = file
+        self._size = os.fstat(file.fileno()).st_size
+        self._chunk_size = chunk_size
+
+        if hasattr(os, "posix_fadvise"):
+            try:
+                os.posix_fadvise(file.fileno(), 0, 0, os.POSIX_FADV_SEQUENTIAL)
+            except OSError:
+                pass
+
+    def __len__(self) -> int:
+        return self._size
+
+    def __iter__(self) -> Iterator[memoryview]:
+        buffer = memoryview(bytearray(self._chunk_size))
+        while size := self._file.readinto(buffer):
+            yield buffer[:size]
 
 
 class SyncService(ABC):
     """
     Абстрактный класс для синхронизации файлов с удаленным хранилищем.
 
+    Может использоваться как контекстный менеджер: при выходе из блока with вызывается close().
+
     Атрибуты:
         _path_host (Path): Путь к удаленному хранилищу.
     """
@@ -26,6 +87,21 @@ class SyncService(ABC):
 
         self._path_host = path_host
 
+    def __enter__(self) -> "SyncService":
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback) -> None:
+        self.close()
+
+    def close(self) -> None:
+        """
+        Освобождает ресурсы клиента (например, открытые соединения).
+
+        По умолчанию ничего не делает.
+        """
+
+        pass
+
     @abstractmethod
     def load(self, path_local_file: Path) -> bool:
         """
@@ -39,7 +115,6 @@ class SyncService(ABC):
 
         Исключения:
             RequestError: Если запрос не удался.
-            APIUrlsError: Если URL для работы с API отсутствует.
         """
 
         pass
@@ -57,7 +132,6 @@ class SyncService(ABC):
 
         Исключения:
             RequestError: Если запрос не удался.
-            APIUrlsError: Если URL для работы с API отсутствует.
         """
 
         pass
@@ -75,7 +149,6 @@ class SyncService(ABC):
 
         Исключения:
             RequestError: Если запрос не удался.
-            APIUrlsError: Если URL для работы с API отсутствует.
         """
 
         pass
@@ -90,7 +163,6 @@ class SyncService(ABC):
 
         Исключения:
             RequestError: Если запрос не удался.
-            APIUrlsError: Если URL для работы с API отсутствует.
         """
 
         pass
@@ -101,103 +173,208 @@ class YandexDiskSyncService(SyncService):
     Класс для синхронизации с Яндекс.Диском.
 
     Атрибуты:
-        _urls (dict): URL-адреса для работы с API Яндекс.Диска.
+        _url_upload (str): URL для получения ссылки на загрузку файла (параметры запроса передаются через params).
+        _url_resources (str): URL для получения информации о ресурсах и их удаления.
+        _fields_info (str): Поля ресурсов, запрашиваемые при получении информации о файлах.
+        _page_size (int): Количество ресурсов на одной странице при получении информации о файлах.
+        _path_host_str (str): Путь к удаленному хранилищу в виде строки для параметров запроса.
+        _path_host_prefix (str): Путь к удаленному хранилищу с завершающим '/' для путей к файлам.
         _token (str): Токен авторизации для доступа к API.
         _headers (dict): Заголовки для HTTP-запросов.
+        _session (requests.Session): HTTP-сессия с пулом постоянных соединений.
+        _upload_semaphore (threading.BoundedSemaphore): Ограничение количества одновременных загрузок файлов.
+        _timeout_api (tuple[float, float]): Таймауты (соединение, чтение) для запросов к API.
+        _timeout_upload (tuple[float, Optional[float]]): Таймауты (соединение, чтение) для загрузки файлов.
     """
 
-    _urls = {
-        "load": "https://cloud-api.yandex.net/v1/disk/resources/upload?path={}&overwrite={}",
-        "get_info": "https://cloud-api.yandex.net/v1/disk/resources?path={}&fields=_embedded.items",
-        "delete": "https://cloud-api.yandex.net/v1/disk/resources?path={}",
-    }
-
-    def __init__(self, token: str, path_host: Path):
+    _url_upload = "https://cloud-api.yandex.net/v1/disk/resources/upload"
+    _url_resources = "https://cloud-api.yandex.net/v1/disk/resources"
+    _fields_info = "_embedded.items.name,_embedded.items.md5,_embedded.items.type"
+    _page_size = 1000
+
+    def __init__(
+        self,
+        token: str,
+        path_host: Path,
+        max_workers: int = 16,
+        max_uploads: int = 6,
+        connect_timeout: float = 10,
+        read_timeout_api: float = 30,
+        read_timeout_upload: Optional[float] = 600,
+    ):
         """
         Инициализация YandexDiskSyncService.
 
         Аргументы:
             token (str): Токен авторизации для доступа к Яндекс.Диску.
             path_host (Path): Путь к удаленному хранилищу на Яндекс.Диске.
+            max_workers (int): Максимальное количество параллельных операций с хранилищем
+                (должно совпадать с размером пула потоков SyncApp, по нему рассчитывается размер пула соединений).
+            max_uploads (int): Максимальное количество одновременных загрузок файлов.
+                Загрузки ограничены отдельно, чтобы не превышать лимиты API Яндекс.Диска
+                и не делить канал между слишком большим количеством файлов.
+            connect_timeout (float): Время ожидания установки соединения (в секундах).
+            read_timeout_api (float): Время ожидания данных от API (в секундах).
+            read_timeout_upload (Optional[float]): Время ожидания ответа при загрузке файла (в секундах).
+                Отсчитывается от последней активности сокета, а не от начала загрузки,
+                поэтому большие файлы на медленном канале не прерываются. None — без ограничения.
         """
 
         super().__init__(path_host=path_host)
+        self._path_host_str = str(path_host)
+        # Пути к файлам собираются конкатенацией строк, без создания Path на каждый запрос.
+        # rstrip("/") не дает получить двойной '/', если указан корень ("/").
+        self._path_host_prefix = self._path_host_str.rstrip("/") + "/"
         self._token = "OAuth {}".format(token)
         self._headers = {"Authorization": self._token}
+        self._upload_semaphore = threading.BoundedSemaphore(max_uploads)
+        self._timeout_api = (connect_timeout, read_timeout_api)
+        self._timeout_upload = (connect_timeout, read_timeout_upload)
+
+        # Сессия переиспользует TCP+TLS соединения между запросами.
+        # Токен передается только в запросах к API, а не на URL для загрузки файлов.
+        # Загрузка файлов (PUT) не повторяется автоматически: повторную попытку с новым URL выполняет SyncApp.
+        # Ответы 429 и 5xx повторяются не более трех раз, ожидание по заголовку Retry-After ограничено
+        # (см. _BoundedRetry), поэтому запрос не блокирует поток надолго: дальнейшие повторы с растущим
+        # интервалом выполняет SyncApp. Если попытки исчерпаны, возвращается последний ответ,
+        # и ошибка API попадает в RequestError с исходным сообщением.
+        self._session = requests.Session()
+        # Размер пула на хост покрывает все потоки, которые одновременно обращаются к API:
+        # max_workers потоков пула SyncApp и основной поток, получающий список файлов.
+        # Каждый поток получает свое постоянное соединение, и лишние соединения не закрываются после запроса.
+        adapter = HTTPAdapter(
+            pool_connections=32,
+            pool_maxsize=max_workers + 1,
+            max_retries=_BoundedRetry(
+                total=3,
+                backoff_factor=0.5,
+                status_forcelist=[429, 500, 502, 503, 504],
+                allowed_methods=frozenset(["GET", "DELETE"]),
+                respect_retry_after_header=True,
+                raise_on_status=False,
+            ),
+        )
+        self._session.mount("https://", adapter)
+
+    def close(self) -> None:
+        """
+        Закрывает HTTP-сессию и все постоянные соединения пула.
+        """
 
-    def load(self, path_local_file: Path) -> bool:
+        self._session.close()
+
+    @staticmethod
+    def _get_error_message(response: requests.Response) -> str:
         """
-        Загружает файл в Яндекс.Диск.
+        Извлекает сообщение об ошибке из ответа API.
+
+        Тело ответа разбирается только на пути ошибки. Если оно не является JSON
+        с полем message (например, страница ошибки прокси), возвращается код и статус ответа.
 
         Аргументы:
-            path_local_file (Path): Путь к локальному файлу.
+            response (requests.Response): Ответ с кодом ошибки.
 
         Возвращает:
-            bool: True, если загрузка успешна, иначе выбрасывает исключение.
+            str: Сообщение об ошибке.
+        """
+
+        try:
+            return orjson.loads(response.content)["message"]
+        except (orjson.JSONDecodeError, KeyError, TypeError):
+            return "{} {}".format(response.status_code, response.reason)
+
+    def _get_upload_href(self, filename: str, overwrite: bool) -> str:
+        """
+        Получает URL для загрузки файла в Яндекс.Диск.
+
+        Аргументы:
+            filename (str): Имя файла.
+            overwrite (bool): Перезаписывать ли существующий файл.
+
+        Возвращает:
+            str: URL для загрузки файла.
 
         Исключения:
             RequestError: Если запрос не удался.
-            APIUrlsError: Если URL для работы с API отсутствует.
+        """
 
-         Примечание: Метод ожидает наличие файла по указанному пути.
-         Если файл отсутствует, будет выброшено исключение FileNotFoundError.
-         """
+        # Параметры кодирует requests: пробелы, '#', '&' и не-ASCII символы в имени файла не ломают запрос.
+        params = {"path": self._path_host_prefix + filename, "overwrite": "true" if overwrite else "false"}
 
-        url = self._urls.get("load")
+        response = self._session.get(url=self._url_upload, params=params, headers=self._headers, timeout=self._timeout_api)
 
-        if not url:
-            raise APIUrlsError
+        if response.status_code == 200:
+            return orjson.loads(response.content)["href"]
+        else:
+            raise RequestError("Ошибка при работе с запросом: {}".format(self._get_error_message(response)))
 
-        url = url.format(self._path_host / path_local_file.name, False)
+    def _upload(self, path_local_file: Path, overwrite: bool) -> bool:
+        """
+        Загружает файл в Яндекс.Диск по URL для загрузки.
 
-        get_url_for_load = requests.get(url=url, headers=self._headers, timeout=60)
+        Общая реализация load и reload: методы отличаются только параметром overwrite.
 
-        data_get_url_for_load = get_url_for_load.json()
-        url_for_load = data_get_url_for_load["href"]
+        URL для загрузки запрашивается непосредственно перед ожиданием места среди одновременных загрузок.
+        Пока одни потоки загружают файлы, другие уже получают URL для следующих, поэтому запрос URL
+        не добавляется ко времени загрузки. Заранее полученных URL не больше, чем потоков,
+        ожидающих загрузки, и они не успевают устареть (ссылки Яндекс.Диска ограничены по времени).
 
-        with open(path_local_file, "rb") as f:
-            response = requests.put(url=url_for_load, data=f, timeout=60)
+        Аргументы:
+            path_local_file (Path): Путь к локальному файлу.
+            overwrite (bool): Перезаписывать ли существующий файл.
+
+        Возвращает:
+            bool: True, если загрузка успешна, иначе выбрасывает исключение.
+
+        Исключения:
+            RequestError: Если запрос не удался.
+            FileNotFoundError: Если файл отсутствует по указанному пути.
+        """
+
+        href = self._get_upload_href(filename=path_local_file.name, overwrite=overwrite)
+
+        with self._upload_semaphore, open(path_local_file, "rb") as f:
+            response = self._session.put(url=href, data=FileChunks(f), timeout=self._timeout_upload)
 
         if response.status_code == 201:
             return True
         else:
-            data = response.json()
-            raise RequestError("Ошибка при работе с запросом: {}".format(data["message"]))
+            raise RequestError("Ошибка при работе с запросом: {}".format(self._get_error_message(response)))
 
-    def reload(self, path_local_file: Path) -> bool:
+    def load(self, path_local_file: Path) -> bool:
         """
-        Обновляет файл в Яндекс.Диске.
+        Загружает файл в Яндекс.Диск.
 
         Аргументы:
             path_local_file (Path): Путь к локальному файлу.
 
         Возвращает:
-            bool: True, если обновление успешна, иначе выбрасывает исключение.
+            bool: True, если загрузка успешна, иначе выбрасывает исключение.
 
         Исключения:
             RequestError: Если запрос не удался.
-            APIUrlsError: Если URL для работы с API отсутствует.
-        """
 
-        url = self._urls.get("load")
+         Примечание: Метод ожидает наличие файла по указанному пути.
+         Если файл отсутствует, будет выброшено исключение FileNotFoundError.
+         """
 
-        if not url:
-            raise APIUrlsError
+        return self._upload(path_local_file=path_local_file, overwrite=False)
 
-        url = url.format(self._path_host / path_local_file.name, True)
+    def reload(self, path_local_file: Path) -> bool:
+        """
+        Обновляет файл в Яндекс.Диске.
 
-        get_url_for_reload = requests.get(url=url, headers=self._headers, timeout=60)
-        data_get_url_for_reload = get_url_for_reload.json()
-        url_for_reload = data_get_url_for_reload["href"]
+        Аргументы:
+            path_local_file (Path): Путь к локальному файлу.
 
-        with open(path_local_file, "rb") as f:
-            response = requests.put(url=url_for_reload, data=f, timeout=60)
+        Возвращает:
+            bool: True, если обновление успешна, иначе выбрасывает исключение.
 
-        if response.status_code == 201:
-            return True
-        else:
-            data = response.json()
-            raise RequestError("Ошибка при работе с запросом: {}".format(data["message"]))
+        Исключения:
+            RequestError: Если запрос не удался.
+        """
+
+        return self._upload(path_local_file=path_local_file, overwrite=True)
 
     def delete(self, filename: str) -> bool:
         """
@@ -211,58 +388,58 @@ class YandexDiskSyncService(SyncService):
 
         Исключения:
             RequestError: Если запрос не удался.
-            APIUrlsError: Если URL для работы с API отсутствует.
         """
 
-        path_file = self._path_host / filename
-        url = self._urls.get("delete")
-
-        if not url:
-            raise APIUrlsError
-
-        url = url.format(path_file)
+        params = {"path": self._path_host_prefix + filename}
 
-        response = requests.delete(url=url, headers=self._headers, timeout=60)
+        response = self._session.delete(url=self._url_resources, params=params, headers=self._headers, timeout=self._timeout_api)
 
         if response.status_code == 204:
             return True
         else:
-            data = response.json()
-            raise RequestError("Ошибка при работе с запросом: {}".format(data["message"]))
+            raise RequestError("Ошибка при работе с запросом: {}".format(self._get_error_message(response)))
 
     def get_info(self) -> dict[str, str]:
         """
         Получает информацию о файлах на Яндекс.Диске.
 
+        Список файлов запрашивается страницами по _page_size элементов (по умолчанию API возвращает
+        только первые 20), поэтому в памяти одновременно находится разобранный JSON только одной страницы.
+
         Возвращает:
             dict[str, str]: Словарь с именами файлов и их MD5-хешами.
 
         Исключения:
             RequestError: Если запрос не удался.
-            APIUrlsError: Если URL для работы с API отсутствует.
+            NotFoundHostPathError: Если директория на Яндекс.Диске не найдена.
         """
 
-        url = self._urls.get("get_info")
-
-        if not url:
-            raise APIUrlsError
+        files_host = {}
 
-        url = url.format(self._path_host)
+        for offset in count(step=self._page_size):
+            params = {
+                "path": self._path_host_str,
+                "fields": self._fields_info,
+                "limit": self._page_size,
+                "offset": offset,
+                "sort": "name",
+            }
 
-        response = requests.get(url=url, headers=self._headers, timeout=60)
-        data = response.json()
+            response = self._session.get(url=self._url_resources, params=params, headers=self._headers, timeout=self._timeout_api)
 
-        logger.debug("Полученные данные с удаленного хранилища: {}".format(data))
+            if response.status_code == 200:
+                items = orjson.loads(response.content)["_embedded"]["items"]
+                logger.debug("Полученные данные с удаленного хранилища (offset={}): {}", offset, items)
 
-        if response.status_code == 200:
-            files_host = {
-                file_info["name"]: file_info["md5"]
-                for file_info in data["_embedded"]["items"]
-                if file_info.get("type") == "file"
-            }
+                files_host.update(
+                    (file_info["name"], file_info["md5"])
+                    for file_info in items
+                    if file_info.get("type") == "file"
+                )
 
-            return files_host
-        elif response.status_code == 404:
-            raise NotFoundHostPathError
-        else:
-            raise RequestError("Ошибка при работе с запросом: {}".format(data["message"]))
+                if len(items) < self._page_size:
+                    return files_host
+            elif response.status_code == 404:
+                raise NotFoundHostPathError
+            else:
+                raise RequestError("Ошибка при работе с запросом: {}".format(self._get_error_message(response)))
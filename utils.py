@@ -1,52 +1,180 @@
+from concurrent.futures import ThreadPoolExecutor
 import hashlib
+import json
+import os
 from pathlib import Path
-import sys
+import random
+from stat import S_ISREG
+import tempfile
+from typing import Iterable, Optional
 
 from loguru import logger
 
+from exceptions import NotFoundLocalPathError
 
-def get_local_files(path_local: Path, debug_timeout: int) -> dict[str, str]:
+HASH_CACHE_PATH = Path.home() / ".cache" / "syncservice" / "hashes.json"
+MAX_RETRY_DELAY = 60
+
+# Кэш MD5-хешей: путь к файлу -> (st_mtime_ns, st_size, MD5-хеш).
+_HASH_CACHE: dict[str, tuple[int, int, str]] = {}
+_hash_cache_changed = False
+
+
+def get_local_files(path_local: Path, debug_timeout: int, max_workers: int = 8) -> dict[str, Optional[str]]:
     """
     Получает словарь локальных файлов и их MD5-хешей.
 
     Функция перебирает все файлы в указанной директории и вычисляет их MD5-хеши.
-    Если возникает ошибка FileNotFoundError, функция завершает работу приложения с кодом 1.
+    Хеши неизмененных файлов (совпадают время изменения и размер) берутся из кэша,
+    остальные вычисляются параллельно в пуле потоков (hashlib освобождает GIL во время хеширования).
+    Файлы, удаленные во время сканирования, в результат не попадают.
+    Для файлов, которые не удалось прочитать (например, из-за прав доступа), вместо хеша указывается None.
 
     Аргументы:
         path_local (Path): Путь к локальной директории, где находятся файлы.
         debug_timeout (int): Время ожидания перед повторной попыткой (не используется в текущей реализации).
+        max_workers (int): Количество потоков для хеширования файлов.
 
     Возвращает:
-        dict[str, str]: Словарь, где ключом является имя файла,
-        а значением — его MD5-хеш.
+        dict[str, Optional[str]]: Словарь, где ключом является имя файла,
+        а значением — его MD5-хеш или None, если файл не удалось прочитать.
 
     Исключения:
-        FileNotFoundError: Если указанная директория не найдена.
+        NotFoundLocalPathError: Если указанная директория не найдена.
+        OSError: Если директорию не удалось прочитать по другой причине.
+    """
+
+    try:
+        # DirEntry.is_file() использует тип из записи каталога без отдельного вызова stat(),
+        # а единственный stat() на файл передается в кэш хешей.
+        with os.scandir(path_local) as it:
+            entries = [entry for entry in it if entry.is_file()]
+    except FileNotFoundError:
+        raise NotFoundLocalPathError("Локальная директория '{}' не найдена.".format(path_local))
+
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        files = dict(item for item in executor.map(_get_entry_md5, entries) if item is not None)
+    prune_hash_cache(path_local=path_local, filenames=files.keys())
+    save_hash_cache()
+    logger.debug("Результат обновления списка локальных файлов: {}", files)
+    return files
+
+
+def _get_entry_md5(entry: os.DirEntry) -> Optional[tuple[str, Optional[str]]]:
+    """
+    Возвращает имя и MD5-хеш файла из записи каталога.
+
+    Аргументы:
+        entry (os.DirEntry): Запись каталога, полученная из os.scandir.
+
+    Возвращает:
+        Optional[tuple[str, Optional[str]]]: Имя файла и его MD5-хеш (None, если файл не удалось прочитать)
+        или None, если файл уже удален.
     """
 
-    while True:
+    try:
+        return entry.name, get_md5_cached(file_path=Path(entry.path), stat=entry.stat())
+    except FileNotFoundError:
+        return None
+    except OSError as exc:
+        logger.warning("Файл {!r} не удалось прочитать, он не синхронизируется. {}".format(entry.name, exc))
+        return entry.name, None
+
+
+def update_local_files(
+    path_local: Path, files_local: dict[str, Optional[str]], filenames: set[str]
+) -> dict[str, Optional[str]]:
+    """
+    Обновляет словарь локальных файлов и их MD5-хешей только для указанных файлов.
+
+    Файлы, которые больше не существуют, удаляются из словаря и из кэша хешей, остальные хешируются заново.
+    Для файлов, которые не удалось прочитать, вместо хеша указывается None.
+
+    Аргументы:
+        path_local (Path): Путь к локальной директории, где находятся файлы.
+        files_local (dict[str, Optional[str]]): Текущий словарь локальных файлов и их MD5-хешей.
+        filenames (set[str]): Имена измененных файлов.
+
+    Возвращает:
+        dict[str, Optional[str]]: Новый словарь, где ключом является имя файла,
+        а значением — его MD5-хеш или None, если файл не удалось прочитать.
+    """
+
+    files = dict(files_local)
+
+    for filename in filenames:
+        file = path_local / filename
         try:
-            files = {
-                file.name: get_md5(file_path=file)
-                for file in path_local.iterdir()
-                if file.is_file()
-            }
-            logger.debug(
-                "Результат обновления списка локальных файлов: {}".format(
-                    files
-                )
-            )
+            # Один stat() на файл: результат используется и для проверки типа, и для кэша хешей.
+            stat = file.stat()
+            if S_ISREG(stat.st_mode):
+                files[filename] = get_md5_cached(file_path=file, stat=stat)
+                continue
         except FileNotFoundError:
-            logger.error("ОШИБКА. Локальная директория '{}' не найдена.".format(path_local))
-            sys.exit(1)
-        else:
-            return files
+            pass
+        except OSError as exc:
+            logger.warning("Файл {!r} не удалось прочитать, он не синхронизируется. {}".format(filename, exc))
+            files[filename] = None
+            continue
+        files.pop(filename, None)
+        _drop_cached_md5(file_path=file)
+
+    logger.debug("Результат обновления списка локальных файлов: {}", files)
+    return files
+
+
+def get_files_signature(files: dict[str, str]) -> int:
+    """
+    Вычисляет сигнатуру словаря файлов: XOR хешей пар (имя файла, MD5-хеш).
+
+    Равные словари имеют равные сигнатуры. XOR позволяет обновлять сигнатуру
+    по отдельным файлам (см. update_files_signature), не пересчитывая ее целиком.
+
+    Аргументы:
+        files (dict[str, str]): Словарь, где ключом является имя файла, а значением — его MD5-хеш.
+
+    Возвращает:
+        int: Сигнатура словаря.
+    """
+
+    signature = 0
+    for item in files.items():
+        signature ^= hash(item)
+    return signature
+
+
+def update_files_signature(
+    signature: int, files_old: dict[str, str], files_new: dict[str, str], filenames: set[str]
+) -> int:
+    """
+    Обновляет сигнатуру словаря файлов только для измененных файлов.
+
+    Аргументы:
+        signature (int): Сигнатура словаря files_old.
+        files_old (dict[str, str]): Словарь файлов до изменения.
+        files_new (dict[str, str]): Словарь файлов после изменения.
+        filenames (set[str]): Имена измененных файлов.
+
+    Возвращает:
+        int: Сигнатура словаря files_new.
+    """
+
+    for filename in filenames:
+        if filename in files_old:
+            signature ^= hash((filename, files_old[filename]))
+        if filename in files_new:
+            signature ^= hash((filename, files_new[filename]))
+    return signature
 
 
 def get_md5(file_path: Path):
     """
     Вычисляет MD5-хеш для указанного файла.
 
+    Файл читается через hashlib.file_digest блоками в собственный буфер, поэтому открывается без буферизации.
+
+    Используется именно MD5, так как удаленное хранилище возвращает MD5-хеши файлов для сравнения.
+
     Аргументы:
         file_path (Path): Путь к файлу, для которого нужно вычислить хеш.
 
@@ -54,10 +182,147 @@ def get_md5(file_path: Path):
         str: MD5-хеш файла в шестнадцатеричном формате.
     """
 
-    md5_hash = hashlib.md5()
+    with open(file_path, "rb", buffering=0) as f:
+        return hashlib.file_digest(f, lambda: hashlib.md5(usedforsecurity=False)).hexdigest()
+
+
+def get_md5_cached(file_path: Path, stat: Optional[os.stat_result] = None) -> str:
+    """
+    Возвращает MD5-хеш файла, используя кэш.
+
+    Хеш вычисляется заново, только если изменились время изменения или размер файла.
 
-    with open(file_path, "rb") as f:
-        for byte_block in iter(lambda: f.read(4096), b""):
-            md5_hash.update(byte_block)
+    Аргументы:
+        file_path (Path): Путь к файлу, для которого нужно получить хеш.
+        stat (Optional[os.stat_result]): Уже полученный результат stat() файла. Если не указан, запрашивается заново.
+
+    Возвращает:
+        str: MD5-хеш файла в шестнадцатеричном формате.
+    """
+
+    global _hash_cache_changed
+
+    if stat is None:
+        stat = file_path.stat()
+    key = str(file_path.absolute())
+    cached = _HASH_CACHE.get(key)
+
+    if cached is not None and cached[0] == stat.st_mtime_ns and cached[1] == stat.st_size:
+        return cached[2]
+
+    md5_hash = get_md5(file_path=file_path)
+    _HASH_CACHE[key] = (stat.st_mtime_ns, stat.st_size, md5_hash)
+    _hash_cache_changed = True
+    return md5_hash
+
+
+def _drop_cached_md5(file_path: Path) -> None:
+    """
+    Удаляет из кэша MD5-хешей запись о файле, которого больше нет.
+
+    Аргументы:
+        file_path (Path): Путь к файлу.
+    """
+
+    global _hash_cache_changed
+
+    if _HASH_CACHE.pop(str(file_path.absolute()), None) is not None:
+        _hash_cache_changed = True
+
+
+def load_hash_cache() -> None:
+    """
+    Загружает кэш MD5-хешей из файла HASH_CACHE_PATH.
+
+    Если файл отсутствует или поврежден, кэш остается пустым.
+    """
+
+    try:
+        with open(HASH_CACHE_PATH, "r", encoding="utf-8") as f:
+            data = json.load(f)
+        if not isinstance(data, dict):
+            raise ValueError("ожидался объект JSON, получено: {}".format(type(data).__name__))
+        cache = {path: tuple(value) for path, value in data.items()}
+        if not all(len(value) == 3 for value in cache.values()):
+            raise ValueError("запись кэша должна содержать время изменения, размер и MD5-хеш")
+        _HASH_CACHE.update(cache)
+    except (OSError, ValueError, TypeError) as exc:
+        logger.debug("Кэш MD5-хешей не загружен. {}", exc)
+
+
+def prune_hash_cache(path_local: Path, filenames: Iterable[str]) -> None:
+    """
+    Удаляет из кэша MD5-хешей записи о файлах директории, которых в ней больше нет.
+
+    Записи о файлах из других директорий не затрагиваются.
+
+    Аргументы:
+        path_local (Path): Путь к локальной директории.
+        filenames (Iterable[str]): Имена файлов, которые сейчас находятся в директории.
+    """
+
+    global _hash_cache_changed
+
+    directory = str(path_local.absolute())
+    filenames = set(filenames)
+    stale = [
+        key
+        for key in _HASH_CACHE
+        if os.path.dirname(key) == directory and os.path.basename(key) not in filenames
+    ]
+
+    for key in stale:
+        del _HASH_CACHE[key]
+    if stale:
+        _hash_cache_changed = True
+
+
+def save_hash_cache() -> None:
+    """
+    Сохраняет кэш MD5-хешей в файл HASH_CACHE_PATH, если он изменился.
+
+    Кэш записывается во временный файл с уникальным именем, который затем атомарно заменяет HASH_CACHE_PATH,
+    поэтому при аварийном завершении записи предыдущая версия кэша не теряется, а несколько запущенных
+    экземпляров приложения не пишут в один временный файл.
+    Вызывается после полного сканирования директории и при остановке приложения (см. SyncApp.close).
+    """
+
+    global _hash_cache_changed
+
+    if not _hash_cache_changed:
+        return
+
+    tmp_path = None
+    try:
+        HASH_CACHE_PATH.parent.mkdir(parents=True, exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=HASH_CACHE_PATH.parent, prefix=HASH_CACHE_PATH.name, suffix=".tmp")
+        with open(fd, "w", encoding="utf-8") as f:
+            json.dump(_HASH_CACHE, f)
+        os.replace(tmp_path, HASH_CACHE_PATH)
+    except OSError as exc:
+        logger.warning("Не удалось сохранить кэш MD5-хешей. {}".format(exc))
+        if tmp_path is not None:
+            try:
+                os.unlink(tmp_path)
+            except OSError:
+                pass
+    else:
+        _hash_cache_changed = False
+
+
+def get_retry_delay(attempt: int, debug_timeout: int) -> float:
+    """
+    Вычисляет время ожидания перед повторной попыткой: экспоненциальный рост со случайным разбросом.
+
+    Задержка удваивается с каждой попыткой, начиная с debug_timeout, но не превышает MAX_RETRY_DELAY.
+    Случайный разброс (±50%) не дает параллельным операциям повторять запросы одновременно.
+
+    Аргументы:
+        attempt (int): Номер неудачной попытки (начиная с 0).
+        debug_timeout (int): Начальное время ожидания (в секундах).
+
+    Возвращает:
+        float: Время ожидания в секундах.
+    """
 
-    return md5_hash.hexdigest()
+    return min(MAX_RETRY_DELAY, debug_timeout * 2 ** min(attempt, 16) * random.uniform(0.5, 1.5))